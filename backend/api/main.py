@@ -1,32 +1,69 @@
 import os
 import json
+import functools
 import joblib
+import anyio
+import numpy as np
 import pandas as pd
+from contextlib import asynccontextmanager
 from typing import Dict, Any
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
+from sqlparse.exceptions import SQLParseError
 
 # Import all our core logic components
 from core.parser import SQLParser
 from core.analyser import QueryAnalyzer
 from core.index_advisor import IndexAdvisor
 from core.optimizer import QueryOptimizer
+from core.fast_path import analyze_simple_select
 from database.plan_explainer import PostgresPlanExplainer
 
-# --- Load the ML Model on Startup ---
 # Use the absolute path inside the container
 model_path = '/app/ml/model.joblib'
-try:
-    model = joblib.load(model_path)
-    print("✅ ML model loaded successfully.")
-except FileNotFoundError:
-    model = None
-    print("⚠️ ML model not found. Running without ML predictions.")
+# Feature columns, in the order the model was trained on
+_FEATURE_COLS = ['join_count', 'where_clause_count']
+
+def load_model():
+    """Loads the ML model, or returns None if it hasn't been trained yet."""
+    try:
+        model = joblib.load(model_path)
+        print("✅ ML model loaded successfully.")
+        return model
+    except FileNotFoundError:
+        print("⚠️ ML model not found. Running without ML predictions.")
+        return None
+
+# --- Application Lifespan ---
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Builds long-lived resources once at startup and keeps them on app.state,
+    so request handlers don't reload the model or rebuild DB settings.
+    """
+    app.state.model = load_model()
+    app.state.pg_connection_params = {
+        "dbname": os.environ.get("POSTGRES_DB"),
+        "user": os.environ.get("POSTGRES_USER"),
+        "password": os.environ.get("POSTGRES_PASSWORD"),
+        "host": "db",  # Use the service name from docker-compose
+        "port": "5432"
+    }
+    app.state.plan_explainer = PostgresPlanExplainer(app.state.pg_connection_params)
+    # Parsing and analysis are CPU-bound Python, so running more of them at once
+    # than we have cores only adds GIL contention. Blocking work is offloaded to
+    # worker threads, bounded by these limiters, to keep the event loop free.
+    app.state.cpu_limiter = anyio.CapacityLimiter(os.cpu_count() or 1)
+    # One worker thread per pooled connection, so extra requests queue on the
+    # event loop rather than parking worker threads on the pool.
+    app.state.db_limiter = anyio.CapacityLimiter(app.state.plan_explainer.max_connections)
+    yield
+    app.state.plan_explainer.close()
 
 # Initialize the FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # --- CORS Middleware ---
 # Allows our React frontend to communicate with this backend
@@ -46,44 +83,88 @@ app.add_middleware(
 class SQLQueryRequest(BaseModel):
     sql: str
 
+class ExplainPlanRequest(SQLQueryRequest):
+    # Set to False to get estimated costs only, without executing the query
+    analyze: bool = True
+    # Set to True to bypass the cached plan, e.g. after creating an index
+    refresh: bool = False
+
 # --- API Endpoints ---
 @app.get("/")
 def read_root():
     return {"message": "SQL Optimizer API is running."}
 
 
-@app.post("/api/v1/analyze-query")
-def analyze_query(request: SQLQueryRequest) -> Dict[str, Any]:
+@functools.lru_cache(maxsize=256)
+def get_full_analysis(sql_query: str) -> Dict[str, Any]:
     """
-    This endpoint receives a SQL query and returns a full analysis,
-    including index recommendations and optimization suggestions.
+    Runs the parser, analyzer, index advisor and optimizer for a query.
+    Results are memoized on the raw SQL text so repeated queries (dashboards,
+    N+1 patterns) skip the whole pipeline. Callers must not mutate the result.
     """
-    sql_query = request.sql
-    
     # 1. Parse and Analyze
-    parser = SQLParser(sql_query)
-    analyzer = QueryAnalyzer(parser)
-    analysis_report = analyzer.run_analysis()
+    # Fast path: simple single-table SELECTs are analyzed without sqlparse.
+    # None of the rewrite rules (UNION, IN-subquery) can apply to them.
+    simple_analysis = analyze_simple_select(sql_query)
+    if simple_analysis is not None:
+        analysis_report, alias_to_table_map = simple_analysis
+        rewrite_suggestions = []
+    else:
+        try:
+            parser = SQLParser(sql_query)
+        except SQLParseError as e:
+            # e.g. queries beyond sqlparse's token limit
+            raise HTTPException(status_code=400, detail=f"Could not parse the SQL query: {e}")
+        analyzer = QueryAnalyzer(parser)
+        analysis_report = analyzer.run_analysis()
+        alias_to_table_map = parser.get_tables_and_aliases()
+
+        # 2. Get Query Rewrites
+        optimizer = QueryOptimizer(parser)
+        rewrite_suggestions = optimizer.suggest_rewrites()
+
     analysis_report['raw_sql'] = sql_query
-    
-    # 2. Get Index Recommendations
-    advisor = IndexAdvisor(analysis_report)
+    # The analyzer returns columns in no particular order; sort them once here
+    # so responses (and the recommendations derived from them) are stable.
+    analysis_report['column_usage'] = {
+        key: sorted(cols) for key, cols in analysis_report['column_usage'].items()
+    }
+
+    # 3. Get Index Recommendations
+    advisor = IndexAdvisor(analysis_report, alias_to_table_map)
     index_recommendations = advisor.generate_recommendations()
-    
-    # 3. Get Query Rewrites
-    optimizer = QueryOptimizer(parser)
-    rewrite_suggestions = optimizer.suggest_rewrites()
+
+    return {
+        "analysis": analysis_report,
+        "index_recommendations": index_recommendations,
+        "rewrite_suggestions": rewrite_suggestions,
+    }
+
+
+def _do_analysis(sql_query: str, model) -> Dict[str, Any]:
+    """
+    Synchronous body of the analyze-query endpoint. Runs in a worker thread.
+    """
+    # 1-3. Parse, analyze, and collect recommendations (cached per query)
+    full_analysis = get_full_analysis(sql_query)
+    analysis_report = full_analysis["analysis"]
+    # Copy the recommendations so the ML step doesn't mutate the cached result
+    index_recommendations = [dict(rec) for rec in full_analysis["index_recommendations"]]
+    rewrite_suggestions = full_analysis["rewrite_suggestions"]
     
     # 4. Add ML Predictions (if model is loaded)
-    if model:
-        features = {
-            'join_count': analysis_report.get('join_count', 0),
-            'where_clause_count': len(analysis_report.get('column_usage', {}).get('where_filters', []))
-        }
-        feature_df = pd.DataFrame([features])
-        
+    if model and index_recommendations:
+        X = np.empty((1, len(_FEATURE_COLS)), dtype=np.int32)
+        X[0, 0] = analysis_report.get('join_count', 0)
+        X[0, 1] = len(analysis_report.get('column_usage', {}).get('where_filters', []))
+        if hasattr(model, 'feature_names_in_'):
+            # Models fitted on a DataFrame expect the same named columns back
+            X = pd.DataFrame(X, columns=_FEATURE_COLS, copy=False)
+
+        # The features describe the whole query, not a single recommendation,
+        # so one prediction is shared by every recommendation.
+        prediction = model.predict(X)[0]
         for rec in index_recommendations:
-            prediction = model.predict(feature_df)[0]
             rec['ml_predicted_impact'] = prediction
 
     # 5. Bundle and return all results
@@ -94,19 +175,30 @@ def analyze_query(request: SQLQueryRequest) -> Dict[str, Any]:
     }
 
 
+def _do_explain(sql_query: str, analyze: bool, refresh: bool, explainer: PostgresPlanExplainer) -> Dict[str, Any]:
+    """
+    Synchronous body of the explain-plan endpoint. Runs in a worker thread.
+    """
+    plan = explainer.get_plan(sql_query, analyze=analyze, refresh=refresh)
+    return {"plan": plan}
+
+
+@app.post("/api/v1/analyze-query")
+async def analyze_query(request: SQLQueryRequest, http_request: Request) -> Dict[str, Any]:
+    """
+    This endpoint receives a SQL query and returns a full analysis,
+    including index recommendations and optimization suggestions.
+    """
+    state = http_request.app.state
+    return await anyio.to_thread.run_sync(_do_analysis, request.sql, state.model, limiter=state.cpu_limiter)
+
+
 @app.post("/api/v1/explain-plan")
-def get_query_plan(request: SQLQueryRequest) -> Dict[str, Any]:
+async def get_query_plan(request: ExplainPlanRequest, http_request: Request) -> Dict[str, Any]:
     """
     Receives a SQL query and returns its execution plan from PostgreSQL.
     """
-    PG_CONNECTION_PARAMS = {
-        "dbname": os.environ.get("POSTGRES_DB"),
-        "user": os.environ.get("POSTGRES_USER"),
-        "password": os.environ.get("POSTGRES_PASSWORD"),
-        "host": "db",  # Use the service name from docker-compose
-        "port": "5432"
-    }
-    
-    explainer = PostgresPlanExplainer(PG_CONNECTION_PARAMS)
-    plan = explainer.get_plan(request.sql)
-    return {"plan": plan}
\ No newline at end of file
+    state = http_request.app.state
+    # The explainer blocks on network I/O, so it is bounded by the size of
+    # its connection pool rather than by the CPU-sized limiter.
+    return await anyio.to_thread.run_sync(_do_explain, request.sql, request.analyze, request.refresh, state.plan_explainer, limiter=state.db_limiter)
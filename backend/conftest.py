@@ -0,0 +1,2 @@
+# Makes the backend/ directory importable (core, database, ...) when the tests
+# are run from the repository root, mirroring the layout inside the container.
@@ -1,10 +1,43 @@
 # backend/core/analyzer.py (Final Version)
 
 import re
-from typing import List, Dict, Any, Set, Tuple
+from typing import List, Dict, Any, Optional, Set, Tuple
 
 from core.parser import SQLParser
-from sqlparse.sql import Where, Comparison, Identifier, IdentifierList, Function, Parenthesis
+from sqlparse import tokens as T
+from sqlparse.sql import Where, Comparison, Identifier, IdentifierList, Function, Parenthesis, Comment, Statement, Token, TokenList
+
+# Anti-pattern rules are compiled once at import time
+_FUNC_ON_COL_RE = re.compile(r'\b\w+\s*\(\s*[\w\.]+\s*\)')
+# Matches 'SELECT *' / 'SELECT DISTINCT *' but not 'COUNT(*)' or 't.*', with any
+# whitespace or comments in between. It also matches inside comments, literals
+# and subqueries, so it is only a cheap pre-check before _selects_star() looks
+# at the parsed statement.
+_GAP = r'(?:\s|/\*.*?\*/|--[^\n]*\n)+'
+_SELECT_STAR_RE = re.compile(rf'\bSELECT{_GAP}(?:DISTINCT{_GAP})?\*', re.IGNORECASE | re.DOTALL)
+
+# Clause keywords whose next token holds the columns for that clause
+_CLAUSE_KEYS = {'ORDER BY': 'order_by', 'GROUP BY': 'group_by'}
+
+def _selects_star(statement: Statement) -> bool:
+    """
+    Returns True if a top-level SELECT of the statement selects `*`, i.e. its
+    first select item (after an optional DISTINCT) is a bare wildcard.
+    Subqueries such as `EXISTS (SELECT * ...)` are not top-level and are ignored.
+    """
+    toks = [tok for tok in statement.tokens
+            if not (tok.is_whitespace or isinstance(tok, Comment) or tok.ttype in T.Comment)]
+    for i, token in enumerate(toks[:-1]):
+        if token.ttype is not T.DML or token.normalized != 'SELECT':
+            continue
+        item = toks[i + 1]
+        if item.normalized == 'DISTINCT' and i + 2 < len(toks):
+            item = toks[i + 2]
+        if isinstance(item, IdentifierList):
+            item = item.token_first(skip_cm=True)
+        if item is not None and item.ttype is T.Wildcard:
+            return True
+    return False
 
 class QueryAnalyzer:
     """
@@ -14,21 +47,35 @@ class QueryAnalyzer:
         self.parser = parser
         self.parsed = parser.parsed
 
-    def _recursive_find_identifiers(self, token, columns: Set[Tuple[str, str]]):
-        if isinstance(token, Function):
-            for sub_token in token.tokens:
-                if isinstance(sub_token, Parenthesis):
-                    self._recursive_find_identifiers(sub_token, columns)
-            return
+    def _find_identifiers(self, root: Token, columns: Set[Tuple[str, str]]) -> None:
+        """
+        Walks the token tree under `root` and collects (alias, column) pairs.
+        Uses an explicit stack instead of recursion, as sqlparse groups nest deeply.
+        """
+        stack: List[Token] = [root]
+        while stack:
+            token = stack.pop()
+            if isinstance(token, Function):
+                # Only look at the arguments, never the function name itself
+                stack.extend(sub_token for sub_token in token.tokens if isinstance(sub_token, Parenthesis))
+                continue
+
+            if isinstance(token, Identifier):
+                alias = token.get_parent_name() or 'unknown'
+                column_name = token.get_name()
+                columns.add((alias, column_name))
 
-        if isinstance(token, Identifier):
-            alias = token.get_parent_name() or 'unknown'
-            column_name = token.get_name()
-            columns.add((alias, column_name))
+            if isinstance(token, TokenList):
+                stack.extend(token.tokens)
 
-        if hasattr(token, 'tokens'):
-            for sub_token in token.tokens:
-                self._recursive_find_identifiers(sub_token, columns)
+    @staticmethod
+    def _next_token(toks: List[Token], i: int) -> Optional[Token]:
+        """Returns the first non-whitespace token after position i, if any."""
+        n = len(toks)
+        j = i + 1
+        while j < n and toks[j].is_whitespace:
+            j += 1
+        return toks[j] if j < n else None
 
     def analyze_column_usage(self) -> Dict[str, List[Tuple[str, str]]]:
         usage: Dict[str, Set[Tuple[str, str]]] = {
@@ -36,39 +83,42 @@ class QueryAnalyzer:
             "order_by": set(), "group_by": set(),
         }
         is_after_on = False
-        for token in self.parsed.tokens:
-            if token.is_keyword and token.normalized == 'ON':
-                is_after_on = True
+        toks = self.parsed.tokens
+        find_identifiers = self._find_identifiers
+        clause_key_for = _CLAUSE_KEYS.get
+        for i, token in enumerate(toks):
+            if token.is_keyword:
+                norm = token.normalized
+                if norm == 'ON':
+                    is_after_on = True
+                    continue
+                # Use the same identifier walk for ORDER BY and GROUP BY as well.
+                clause_key = clause_key_for(norm)
+                if clause_key:
+                    next_token = self._next_token(toks, i)
+                    if next_token is not None:
+                        find_identifiers(next_token, usage[clause_key])
                 continue
+
             if is_after_on and isinstance(token, Comparison):
-                self._recursive_find_identifiers(token, usage["join_keys"])
+                find_identifiers(token, usage["join_keys"])
                 is_after_on = False
-            if isinstance(token, Where):
-                self._recursive_find_identifiers(token, usage["where_filters"])
-            
-            # *** THIS IS THE FIX ***
-            # Use the robust recursive method for ORDER BY and GROUP BY as well.
-            if token.is_keyword:
-                clause_key = None
-                if 'ORDER BY' in token.normalized: clause_key = "order_by"
-                elif 'GROUP BY' in token.normalized: clause_key = "group_by"
-                if clause_key:
-                    next_token = self.parsed.token_next(self.parsed.token_index(token))[1]
-                    self._recursive_find_identifiers(next_token, usage[clause_key])
+            elif isinstance(token, Where):
+                find_identifiers(token, usage["where_filters"])
         
-        return {key: sorted(list(cols)) for key, cols in usage.items()}
+        return {key: list(cols) for key, cols in usage.items()}
 
     # --- detect_anti_patterns and run_analysis methods are unchanged ---
     def detect_anti_patterns(self) -> List[Dict[str, str]]:
         anti_patterns = []
         if self.parser.get_query_type() == 'SELECT':
-            if any(token.normalized == '*' for token in self.parsed.tokens):
+            if _SELECT_STAR_RE.search(self.parser.raw_sql) and _selects_star(self.parsed):
                 anti_patterns.append({"type": "SELECT_STAR", "message": "Avoid using 'SELECT *'."})
         query_type = self.parser.get_query_type()
-        if query_type in ('UPDATE', 'DELETE') and not self.parser.extract_where_clause():
-            anti_patterns.append({"type": "MISSING_WHERE_CLAUSE", "message": f"The {query_type} statement lacks a WHERE clause."})
         where_clause_str = self.parser.extract_where_clause()
-        if where_clause_str and re.search(r'\b\w+\s*\(\s*[\w\.]+\s*\)', where_clause_str):
+        if query_type in ('UPDATE', 'DELETE') and where_clause_str is None:
+            anti_patterns.append({"type": "MISSING_WHERE_CLAUSE", "message": f"The {query_type} statement lacks a WHERE clause."})
+        if where_clause_str and _FUNC_ON_COL_RE.search(where_clause_str):
             anti_patterns.append({"type": "FUNCTION_ON_COLUMN_IN_WHERE", "message": "Found a function call on a column in the WHERE clause."})
         return anti_patterns
 
@@ -78,7 +128,7 @@ class QueryAnalyzer:
             "query_type": self.parser.get_query_type(), "tables": tables,
             "anti_patterns": self.detect_anti_patterns(),
             "column_usage": self.analyze_column_usage(),
-            "join_count": len(tables) - 1 if len(tables) > 0 else 0,
+            "join_count": self.parser.get_join_count(),
         }
 
 # --- Example Usage ---
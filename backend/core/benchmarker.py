@@ -1,10 +1,49 @@
 # backend/core/benchmarker.py
 
+import functools
 import sqlite3
 import time
-import pandas as pd
-import numpy as np
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
+
+def _generate_and_load_data(conn: sqlite3.Connection, tables: Tuple[str, ...], num_rows=10000):
+    """
+    Generates synthetic data for the required tables and loads it into SQLite.
+    This is a simplified data generator for demonstration.
+
+    Rows are streamed straight into `executemany` inside a single transaction,
+    avoiding the per-row conversions of building and writing a DataFrame.
+    """
+    with conn:
+        if 'customers_2024' in tables and 'customers_archive' in tables:
+            # Data for the UNION query example
+            conn.execute("DROP TABLE IF EXISTS customers_2024")
+            conn.execute("DROP TABLE IF EXISTS customers_archive")
+            conn.execute("CREATE TABLE customers_2024 (id INTEGER, email TEXT)")
+            conn.execute("CREATE TABLE customers_archive (id INTEGER, email TEXT)")
+            conn.executemany(
+                "INSERT INTO customers_2024 VALUES (?, ?)",
+                ((i, f'customer{i}@2024.com') for i in range(num_rows))
+            )
+            conn.executemany(
+                "INSERT INTO customers_archive VALUES (?, ?)",
+                # Create some overlap for UNION
+                ((i, f'customer{i}@archive.com') for i in range(num_rows // 2, num_rows + num_rows // 2))
+            )
+
+        # Add data generation logic for other schemas (e.g., users, orders) here if needed
+        # ...
+
+@functools.lru_cache(maxsize=8)
+def _build_template_database(tables: Tuple[str, ...]) -> sqlite3.Connection:
+    """
+    Builds and caches a populated in-memory database for a set of tables.
+    The synthetic data is deterministic, so it only has to be generated once;
+    benchmarks copy this template rather than reloading it.
+    """
+    # The template is shared across requests, which may run on different threads
+    template = sqlite3.connect(":memory:", check_same_thread=False)
+    _generate_and_load_data(template, tables)
+    return template
 
 class PerformanceBenchmarker:
     """
@@ -27,34 +66,20 @@ class PerformanceBenchmarker:
         self.conn = None
 
     def _create_test_database(self):
-        """Creates an in-memory SQLite database and populates it with synthetic data."""
-        self.conn = sqlite3.connect(":memory:")
-        self._generate_and_load_data()
-
-    def _generate_and_load_data(self, num_rows=10000):
         """
-        Generates synthetic data for the required tables and loads it into SQLite.
-        This is a simplified data generator for demonstration.
+        Creates an in-memory SQLite database populated with synthetic data,
+        copied from a cached template using SQLite's backup API.
         """
-        cursor = self.conn.cursor()
-
-        if 'customers_2024' in self.tables and 'customers_archive' in self.tables:
-            # Data for the UNION query example
-            customers_2024_df = pd.DataFrame({
-                'id': range(num_rows),
-                'email': [f'customer{i}@2024.com' for i in range(num_rows)]
-            })
-            customers_archive_df = pd.DataFrame({
-                'id': range(num_rows // 2, num_rows + num_rows // 2), # Create some overlap for UNION
-                'email': [f'customer{i}@archive.com' for i in range(num_rows // 2, num_rows + num_rows // 2)]
-            })
-            customers_2024_df.to_sql('customers_2024', self.conn, if_exists='replace', index=False)
-            customers_archive_df.to_sql('customers_archive', self.conn, if_exists='replace', index=False)
-            
-        # Add data generation logic for other schemas (e.g., users, orders) here if needed
-        # ...
+        template = _build_template_database(tuple(sorted(set(self.tables))))
+        # Every timed run re-executes the same SQL text, so each statement is
+        # prepared once and then served from the connection's statement cache.
+        self.conn = sqlite3.connect(":memory:", cached_statements=256)
+        template.backup(self.conn)
 
-        self.conn.commit()
+        # Keep sorts and temporary b-trees (e.g. for UNION) in memory and give
+        # the page cache room for the whole dataset (negative size is in KiB).
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+        self.conn.execute("PRAGMA cache_size=-65536")
 
     def _measure_execution_time(self, sql: str, runs: int = 5) -> float:
         """
@@ -70,15 +95,30 @@ class PerformanceBenchmarker:
         if not self.conn:
             return -1.0
 
-        total_time = 0
         cursor = self.conn.cursor()
+
+        # One untimed warm-up run so the first timed run doesn't pay for cold pages
+        # or for preparing the statement
+        self._run_to_completion(cursor, sql)
+
+        total_time_ns = 0
         for _ in range(runs):
-            start_time = time.perf_counter()
-            cursor.execute(sql).fetchall() # .fetchall() ensures we measure time to get all data
-            end_time = time.perf_counter()
-            total_time += (end_time - start_time)
+            start_time = time.perf_counter_ns()
+            self._run_to_completion(cursor, sql)
+            end_time = time.perf_counter_ns()
+            total_time_ns += (end_time - start_time)
         
-        return total_time / runs
+        return total_time_ns / runs / 1e9
+
+    @staticmethod
+    def _run_to_completion(cursor: sqlite3.Cursor, sql: str, batch_size: int = 1024):
+        """
+        Executes a query and steps through every result row in batches, so the
+        whole query runs without materializing the full result set at once.
+        """
+        cursor.execute(sql)
+        while cursor.fetchmany(batch_size):
+            pass
 
     def run_benchmark(self) -> Dict[str, Any]:
         """
@@ -0,0 +1,92 @@
+# backend/core/fast_path.py
+
+import re
+from typing import List, Dict, Any, Optional, Set, Tuple
+
+from sqlparse import keywords
+
+from core.analyser import _FUNC_ON_COL_RE
+
+# Every word any sqlparse dialect treats as a keyword. Queries that use one of
+# these as a table, alias or column name are left to the generic path, since
+# sqlparse may tokenize them as keywords rather than identifiers.
+_SQLPARSE_KEYWORDS = frozenset(
+    word
+    for name in dir(keywords) if name.startswith('KEYWORDS')
+    for word in getattr(keywords, name)
+)
+
+_IDENT = r"[A-Za-z_][A-Za-z0-9_]*"
+# Backslashes are rejected inside strings: sqlparse treats \' as an escaped
+# quote, so such literals would end in a different place on the generic path.
+_LITERAL = r"(?:-?\d+(?:\.\d+)?|'(?:[^'\\]|'')*')"
+_OP = r"(?:=|<>|!=|<=|>=|<|>)"
+_PREDICATE = rf"{_IDENT}(?:\.{_IDENT})?\s*{_OP}\s*{_LITERAL}"
+
+# SELECT <plain column list> FROM <one table> [alias] [WHERE <col op literal> [AND ...]]
+_SIMPLE_SELECT_RE = re.compile(
+    rf"""\s*SELECT\s+(?P<select>[\w.*\s,]+?)
+    \s+FROM\s+(?P<table>{_IDENT})(?:\s+(?:AS\s+)?(?P<alias>{_IDENT}))?
+    (?:\s+WHERE\s+(?P<where>{_PREDICATE}(?:\s+AND\s+{_PREDICATE})*))?
+    \s*;?\s*$""",
+    re.IGNORECASE | re.VERBOSE,
+)
+_PREDICATE_RE = re.compile(rf"(?:({_IDENT})\.)?({_IDENT})\s*{_OP}\s*{_LITERAL}")
+_WORD_RE = re.compile(_IDENT)
+
+
+def _is_keyword(word: str) -> bool:
+    return word.upper() in _SQLPARSE_KEYWORDS
+
+
+def analyze_simple_select(sql: str) -> Optional[Tuple[Dict[str, Any], Dict[str, str]]]:
+    """
+    Analyzes the most common query shape without building a sqlparse tree:
+    a single-table SELECT whose WHERE clause (if any) only ANDs together
+    `column <op> literal` comparisons.
+
+    Returns:
+        A (analysis report, alias-to-table map) pair identical to what
+        QueryAnalyzer.run_analysis() and SQLParser.get_tables_and_aliases()
+        produce for the same query (up to the order of the column_usage
+        lists; tests/test_fast_path.py checks this), or None if the query has
+        any other shape.
+    """
+    match = _SIMPLE_SELECT_RE.match(sql)
+    if not match:
+        return None
+
+    table, alias, where = match.group('table', 'alias', 'where')
+    names = [table] + _WORD_RE.findall(match.group('select'))
+    if alias:
+        names.append(alias)
+
+    where_filters: Set[Tuple[str, str]] = set()
+    if where:
+        for parent, column in _PREDICATE_RE.findall(where):
+            # Qualified names are always lexed as identifiers by sqlparse
+            if not parent:
+                names.append(column)
+            where_filters.add((parent or 'unknown', column))
+
+    if any(_is_keyword(name) for name in names):
+        return None
+
+    anti_patterns: List[Dict[str, str]] = []
+    # Only the select list is checked, so a '*' inside a WHERE literal doesn't count
+    if match.group('select').startswith('*'):
+        anti_patterns.append({"type": "SELECT_STAR", "message": "Avoid using 'SELECT *'."})
+    # Same text-level check as the generic path, which also fires on literals like 'x(y)'
+    if where and _FUNC_ON_COL_RE.search(where):
+        anti_patterns.append({"type": "FUNCTION_ON_COLUMN_IN_WHERE", "message": "Found a function call on a column in the WHERE clause."})
+
+    report = {
+        "query_type": "SELECT", "tables": [table],
+        "anti_patterns": anti_patterns,
+        "column_usage": {
+            "where_filters": list(where_filters), "join_keys": [],
+            "order_by": [], "group_by": [],
+        },
+        "join_count": 0,
+    }
+    return report, {alias or table: table}
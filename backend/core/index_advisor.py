@@ -1,41 +1,24 @@
 # backend/core/index_advisor.py (Corrected)
 
 from typing import List, Dict, Any, Set, Tuple
-import sqlparse
-from sqlparse.sql import Identifier, IdentifierList
 
 class IndexAdvisor:
     """
     Generates index recommendations based on a query analysis report.
     This version is simpler and more reliable due to improved data from the analyzer.
     """
-    def __init__(self, analysis_report: Dict[str, Any]):
-        self.report = analysis_report
-        self.column_usage = self.report.get("column_usage", {})
-        self.alias_to_table_map = self._map_aliases_to_tables()
-
-    def _map_aliases_to_tables(self) -> Dict[str, str]:
+    def __init__(self, analysis_report: Dict[str, Any], alias_to_table_map: Dict[str, str]):
         """
-        Correctly builds a map of table aliases (e.g., 'u') to real table names (e.g., 'users').
+        Initializes the advisor with an analysis report and the query's table aliases.
+
+        Args:
+            analysis_report (Dict[str, Any]): The report produced by QueryAnalyzer.
+            alias_to_table_map (Dict[str, str]): Table aliases (e.g., 'u') mapped to real
+                table names (e.g., 'users'), as returned by SQLParser.get_tables_and_aliases().
         """
-        mapping = {}
-        parsed = sqlparse.parse(self.report.get("raw_sql", ""))[0] # Assuming raw_sql is passed in report
-        
-        # We need to add raw_sql to the report for this to work
-        from_or_join_seen = False
-        for token in parsed.tokens:
-            if from_or_join_seen:
-                if isinstance(token, Identifier):
-                    mapping[token.get_alias() or token.get_real_name()] = token.get_real_name()
-                elif isinstance(token, IdentifierList):
-                    for identifier in token.get_identifiers():
-                        mapping[identifier.get_alias() or identifier.get_real_name()] = identifier.get_real_name()
-            
-            if token.is_keyword and token.normalized in ('FROM', 'JOIN', 'LEFT JOIN'):
-                from_or_join_seen = True
-            elif token.is_keyword:
-                from_or_join_seen = False # Reset state after FROM/JOIN block
-        return mapping
+        self.report = analysis_report
+        self.column_usage = self.report.get("column_usage", {})
+        self.alias_to_table_map = alias_to_table_map
 
     def _generate_index_name(self, table: str, columns: List[str]) -> str:
         return f"idx_{table}_{'_'.join(columns)}"
@@ -109,9 +92,8 @@ if __name__ == '__main__':
     parser = SQLParser(sample_query)
     analyzer = QueryAnalyzer(parser)
     analysis_results = analyzer.run_analysis()
-    analysis_results['raw_sql'] = sample_query # Add raw_sql to the report for the advisor
 
-    advisor = IndexAdvisor(analysis_results)
+    advisor = IndexAdvisor(analysis_results, parser.get_tables_and_aliases())
     recommendations = advisor.generate_recommendations()
 
     print("\n--- 💡 Index Recommendations (Corrected) ---")
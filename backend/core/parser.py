@@ -1,9 +1,51 @@
 # backend/core/parser.py
 
+import functools
+import re
 import sqlparse
-from sqlparse.sql import Identifier, IdentifierList, Where, Comparison, Function
+from sqlparse.sql import Identifier, IdentifierList, Where, Comparison, Function, Statement, Token, TokenList
 from typing import List, Optional, Set, Dict, Any
 
+# A parenthesised list of ten or more literals, e.g. the body of
+# `id IN (1, 2, 3, ...)`. NULL/TRUE/FALSE count as literals too.
+_LITERAL = r"(?:-?\d+(?:\.\d+)?|'(?:[^']|'')*'|NULL\b|TRUE\b|FALSE\b)"
+_LONG_LITERAL_LIST = (
+    r"\(\s*(" + _LITERAL + r")(?:\s*,\s*" + _LITERAL + r"){8,}\s*,\s*(" + _LITERAL + r")\s*\)"
+)
+# String literals, quoted identifiers and comments are matched as whole spans
+# first, so a list-like text inside one of them is never rewritten.
+_LONG_LITERAL_LIST_RE = re.compile(
+    r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|--[^\n]*|/\*.*?\*/|" + _LONG_LITERAL_LIST,
+    re.IGNORECASE | re.DOTALL,
+)
+
+def _shrink_literal_list(match: re.Match) -> str:
+    first = match.group(1)
+    if first is None:
+        # A quoted span or comment: keep it as-is
+        return match.group(0)
+    return f"({first}, {match.group(2)})"
+
+def _collapse_literal_lists(sql: str) -> str:
+    """
+    Shrinks literal lists of ten or more items down to their first and last items.
+
+    sqlparse's grouping passes scale badly with token count, and very large
+    IN lists exceed its token limit entirely. None of our analysis looks at
+    the individual literals, so they are dropped before parsing.
+    """
+    return _LONG_LITERAL_LIST_RE.sub(_shrink_literal_list, sql)
+
+@functools.lru_cache(maxsize=512)
+def _parse_sql(sql: str) -> Statement:
+    """
+    Parses a SQL string into a sqlparse Statement, memoized on the raw text.
+
+    The returned Statement is shared between callers, so it must be treated
+    as read-only: the parser, analyzer and optimizer only ever read its tokens.
+    """
+    return sqlparse.parse(_collapse_literal_lists(sql))[0]
+
 class SQLParser:
     """
     Parses a raw SQL query string into a structured representation.
@@ -21,19 +63,23 @@ class SQLParser:
             sql (str): The raw SQL query string.
         """
         self.raw_sql = sql
-        self.parsed = sqlparse.parse(self.raw_sql)[0]
-        
+        self.parsed = _parse_sql(self.raw_sql)
+
         self._tables_and_aliases: Optional[Dict[str, str]] = None
+        self._join_count: int = 0
         self._columns: Optional[List[str]] = None
+        self._where_str: Optional[str] = None
 
     def _get_tables_and_aliases(self) -> Dict[str, str]:
         """
         Extracts tables and their aliases. Aliases are keys, real names are values.
+        Counts the query's joins in the same pass (see get_join_count).
         """
         if self._tables_and_aliases is not None:
             return self._tables_and_aliases
 
-        tables = {}
+        tables: Dict[str, str] = {}
+        join_count = 0
         from_or_join_seen = False
         tokens = self.parsed.tokens
 
@@ -44,48 +90,71 @@ class SQLParser:
                     alias = token.get_alias() or real_name
                     tables[alias] = real_name
                 elif isinstance(token, IdentifierList):
-                    for identifier in token.get_identifiers():
+                    identifiers = list(token.get_identifiers())
+                    for identifier in identifiers:
                         real_name = identifier.get_real_name()
                         alias = identifier.get_alias() or real_name
                         tables[alias] = real_name
+                    # Each extra table in a comma-separated FROM list is an implicit join
+                    join_count += len(identifiers) - 1
                 
                 if not (token.is_whitespace or token.normalized == ','):
                     from_or_join_seen = False
 
-            if token.is_keyword and token.normalized in ('FROM', 'JOIN', 'LEFT JOIN', 'RIGHT JOIN', 'INNER JOIN'):
-                from_or_join_seen = True
+            if token.is_keyword:
+                # Join keywords come in many forms ('LEFT OUTER JOIN', 'CROSS JOIN', ...)
+                if token.normalized.endswith('JOIN'):
+                    from_or_join_seen = True
+                    join_count += 1
+                elif token.normalized == 'FROM':
+                    from_or_join_seen = True
         
+        self._join_count = join_count
         self._tables_and_aliases = tables
         return self._tables_and_aliases
 
+    def get_tables_and_aliases(self) -> Dict[str, str]:
+        """Returns the (cached) mapping of table aliases to real table names."""
+        return self._get_tables_and_aliases()
+
+    def get_join_count(self) -> int:
+        """Returns the number of joins in the query, explicit or comma-separated."""
+        self._get_tables_and_aliases()
+        return self._join_count
+
     def extract_tables(self) -> List[str]:
         """Extracts all unique table names referenced in the query."""
         tables_with_aliases = self._get_tables_and_aliases()
         return sorted(list(set(tables_with_aliases.values())))
 
-    def _recursive_extract_columns(self, token, column_set: Set[str]):
+    def _walk_extract_columns(self, root: Token, column_set: Set[str]) -> None:
         """
-        Recursively walks the token tree to find column identifiers,
-        now correctly handling Function objects.
+        Walks the token tree to find column identifiers, correctly handling
+        Function objects. Uses an explicit stack instead of recursion.
         """
-        # If the token is a Function, we don't add its name (e.g., 'COUNT').
-        # Instead, we recurse into its children to find columns used as arguments (e.g., 'id').
-        if isinstance(token, Function):
-            for sub_token in token.tokens:
-                self._recursive_extract_columns(sub_token, column_set)
-            return
-
-        # An Identifier is a potential column.
-        if isinstance(token, Identifier):
-            # We must exclude any identifiers that are actually table names or aliases.
-            all_table_references = list(self._get_tables_and_aliases().keys()) + list(self._get_tables_and_aliases().values())
-            if token.get_real_name() not in all_table_references:
-                column_set.add(token.get_name())
-
-        # If the token is a group (but not a function we've already handled), recurse.
-        if hasattr(token, 'tokens'):
-            for sub_token in token.tokens:
-                self._recursive_extract_columns(sub_token, column_set)
+        # We must exclude any identifiers that are actually table names or aliases.
+        # Built once per walk as a set, so each check is a hash lookup.
+        tables_and_aliases = self._get_tables_and_aliases()
+        all_table_references = frozenset(tables_and_aliases.keys()) | frozenset(tables_and_aliases.values())
+
+        stack: List[Token] = [root]
+        while stack:
+            token = stack.pop()
+
+            # If the token is a Function, we don't add its name (e.g., 'COUNT').
+            # Instead, we walk its children to find columns used as arguments (e.g., 'id').
+            if isinstance(token, Function):
+                stack.extend(token.tokens)
+                continue
+
+            # An Identifier is a potential column.
+            if isinstance(token, Identifier):
+                if token.get_real_name() not in all_table_references:
+                    column_set.add(token.get_name())
+
+            # If the token is a group (but not a function we've already handled), descend.
+            if isinstance(token, TokenList):
+                stack.extend(token.tokens)
 
     def extract_columns(self) -> List[str]:
         """
@@ -95,14 +164,17 @@ class SQLParser:
             return self._columns
 
         columns: Set[str] = set()
-        self._recursive_extract_columns(self.parsed, columns)
+        self._walk_extract_columns(self.parsed, columns)
         self._columns = sorted(list(columns))
         return self._columns
 
     def extract_where_clause(self) -> Optional[str]:
         """Extracts the WHERE clause as a raw string, if it exists."""
-        where_token = next((token for token in self.parsed.tokens if isinstance(token, Where)), None)
-        return str(where_token) if where_token else None
+        if self._where_str is None:
+            where_token = next((token for token in self.parsed.tokens if isinstance(token, Where)), None)
+            # An empty string records that the query has no WHERE clause
+            self._where_str = str(where_token) if where_token else ''
+        return self._where_str or None
 
     def get_query_type(self) -> str:
         """Determines the type of the SQL query (e.g., SELECT, INSERT)."""
@@ -1,8 +1,56 @@
 # backend/database/plan_explainer.py
 
+import atexit
 import json
+import threading
+from hashlib import blake2b
 import psycopg2
-from typing import Dict, Any, List
+import psycopg2.extras
+from psycopg2.pool import ThreadedConnectionPool
+from cachetools import TTLCache
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+
+try:
+    # orjson's C parser and serializer are several times faster than the
+    # stdlib on large plans
+    import orjson
+    _json_loads = orjson.loads
+    _json_dumps = orjson.dumps
+except ImportError:
+    _json_loads = json.loads
+
+    def _json_dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode()
+
+try:
+    # Optional compiled traversal, built by backend/setup.py
+    from database.plan_explainer_cy import transform_plan as _transform_plan_compiled
+except ImportError:
+    _transform_plan_compiled = None
+
+# EXPLAIN prefixes, with and without executing the query. ANALYZE runs it,
+# providing actual execution times and row counts; without it only the planner
+# runs and the actual_* fields are left out.
+_EXPLAIN_ANALYZE = "EXPLAIN (FORMAT JSON, ANALYZE, COSTS, BUFFERS) "
+_EXPLAIN_COSTS = "EXPLAIN (FORMAT JSON, COSTS) "
+
+# Plan node metrics, with the output keys they are reported under
+_METRIC_KEYS = (
+    ("Total Cost", "estimated_cost"),
+    ("Plan Rows", "estimated_rows"),
+    ("Actual Total Time", "actual_time_ms"),
+    ("Actual Rows", "actual_rows"),
+)
+
+# Plan node keys worth surfacing as details, with their display prefixes
+_DETAIL_KEYS = (
+    ("Join Filter", "Join Filter: "),
+    ("Hash Cond", "Hash Cond: "),
+    ("Filter", "Filter: "),
+    ("Index Cond", "Index Cond: "),
+)
 
 class PostgresPlanExplainer:
     """
@@ -10,82 +58,233 @@ class PostgresPlanExplainer:
     of a given SQL query.
     """
 
-    def __init__(self, db_params: Dict[str, Any]):
+    def __init__(self, db_params: Dict[str, Any], max_connections: int = 20):
         """
         Initializes the explainer with database connection parameters.
 
         Args:
             db_params (Dict[str, Any]): Connection details for psycopg2
                                        (e.g., dbname, user, password, host, port).
+            max_connections (int): Upper bound on pooled connections, i.e. on
+                                   concurrent get_plan() calls.
         """
         self.db_params = db_params
+        self.max_connections = max_connections
+        # The pool is opened on first use, so the explainer can be built
+        # before the database is reachable.
+        self._pool: Optional[ThreadedConnectionPool] = None
+        self._pool_lock = threading.Lock()
+        # The pool raises instead of waiting when it runs dry, so callers
+        # queue here for a free connection.
+        self._pool_slots = threading.BoundedSemaphore(max_connections)
+        # EXPLAIN ANALYZE executes the query, so repeat requests for the same
+        # SQL are served from here. The TTL bounds how stale the timings get.
+        self._plan_cache: TTLCache = TTLCache(maxsize=1024, ttl=300)
+        self._plan_cache_lock = threading.Lock()
+        atexit.register(self.close)
+
+    def _get_pool(self) -> ThreadedConnectionPool:
+        """Returns the connection pool, creating it on first use."""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ThreadedConnectionPool(1, self.max_connections, **self.db_params)
+        return self._pool
+
+    def close(self):
+        """Closes every pooled connection."""
+        with self._pool_lock:
+            if self._pool is not None and not self._pool.closed:
+                self._pool.closeall()
+            self._pool = None
 
-    def _transform_plan_node(self, node: Dict[str, Any]) -> Dict[str, Any]:
+    def _transform_plan_node(self, root: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Recursively transforms a raw PostgreSQL plan node into our standardized format.
+        Transforms a raw PostgreSQL plan tree into our standardized format.
+        Walks the tree with an explicit queue rather than recursion, so deep
+        plans don't pay per-node frame overhead or hit the recursion limit.
+        Uses the compiled version of this traversal when it has been built.
         """
-        # Extract key metrics. Use .get() to handle missing keys gracefully.
-        transformed = {
-            "node_type": node.get("Node Type", "Unknown"),
-            "estimated_cost": node.get("Total Cost", 0),
-            "estimated_rows": node.get("Plan Rows", 0),
-            "actual_time_ms": node.get("Actual Total Time", 0),
-            "actual_rows": node.get("Actual Rows", 0),
-            "details": [],
-            "children": []
-        }
-
-        # Add any other interesting details
-        if "Join Filter" in node:
-            transformed["details"].append(f"Join Filter: {node['Join Filter']}")
-        if "Hash Cond" in node:
-            transformed["details"].append(f"Hash Cond: {node['Hash Cond']}")
-        if "Filter" in node:
-            transformed["details"].append(f"Filter: {node['Filter']}")
-        if "Index Cond" in node:
-            transformed["details"].append(f"Index Cond: {node['Index Cond']}")
-
-        # Recursively transform child nodes
-        if "Plans" in node:
-            for child_node in node["Plans"]:
-                transformed["children"].append(self._transform_plan_node(child_node))
-
-        return transformed
-
-    def get_plan(self, sql_query: str) -> Dict[str, Any]:
+        if _transform_plan_compiled is not None:
+            return _transform_plan_compiled(root)
+
+        result: List[Dict[str, Any]] = []
+        # Each entry pairs a raw node with the list its transformed form belongs in.
+        # Processing in FIFO order keeps children in their original order.
+        queue = deque([(root, result)])
+        while queue:
+            node, siblings = queue.popleft()
+
+            get = node.get
+            # Metrics the node doesn't report are left out rather than padded
+            # with zeros, which keeps the payload for wide plans small.
+            transformed = {"node_type": get("Node Type", "Unknown")}
+            for key, name in _METRIC_KEYS:
+                value = get(key)
+                if value is not None:
+                    transformed[name] = value
+
+            # Add any other interesting details (PostgreSQL reports these as strings)
+            details = []
+            for key, prefix in _DETAIL_KEYS:
+                value = get(key)
+                if value is not None:
+                    details.append(prefix + value)
+            if details:
+                transformed["details"] = details
+
+            siblings.append(transformed)
+
+            # Queue child nodes to be transformed into this node's children
+            child_nodes = get("Plans")
+            if child_nodes:
+                children = transformed["children"] = []
+                for child_node in child_nodes:
+                    queue.append((child_node, children))
+
+        return result[0]
+
+    def get_plan(self, sql_query: str, analyze: bool = True, refresh: bool = False) -> Dict[str, Any]:
         """
         Retrieves and parses the execution plan for a SQL query.
 
         Args:
             sql_query (str): The SQL query to explain.
+            analyze (bool): Whether to run the query for actual timings and row
+                            counts. When False, only the planner's estimates are
+                            returned, which is far cheaper for slow queries.
+            refresh (bool): Re-run EXPLAIN ANALYZE even if a cached plan exists,
+                            e.g. after creating an index. The fresh plan
+                            replaces the cached one.
 
         Returns:
-            A standardized dictionary representing the query plan tree.
+            A standardized dictionary representing the query plan tree. ANALYZE
+            plans are cached for a few minutes and shared between callers, so
+            the result must not be mutated.
         """
+        # Only ANALYZE plans are cached: they cost a full query execution,
+        # while planning alone is cheap enough to always reflect the current
+        # schema and indexes.
+        key = blake2b(sql_query.encode(), digest_size=16).digest()
+        if analyze and not refresh:
+            with self._plan_cache_lock:
+                plan = self._plan_cache.get(key)
+            if plan is not None:
+                return plan
+
         # The EXPLAIN command asks PostgreSQL for the execution plan in JSON format.
-        # ANALYZE runs the query, providing actual execution times and row counts.
-        explain_query = f"EXPLAIN (FORMAT JSON, ANALYZE, COSTS, BUFFERS) {sql_query}"
+        # The caller's SQL is the statement being explained, so it has to be
+        # spliced in as text: PostgreSQL can't PREPARE an EXPLAIN, and no
+        # parameter binding applies to a whole statement.
+        explain_query = (_EXPLAIN_ANALYZE if analyze else _EXPLAIN_COSTS) + sql_query
         
+        with self._pool_slots:
+            try:
+                pool = self._get_pool()
+                conn = pool.getconn()
+            except psycopg2.Error as e:
+                print(f"Database error: {e}")
+                return {"error": str(e)}
+
+            try:
+                plan = self._explain(conn, explain_query)
+            finally:
+                # Drop connections that broke (e.g. server restart) or can't be
+                # reset instead of reusing them
+                pool.putconn(conn, close=not self._reset_connection(conn))
+
+        # Errors are not cached, so a fixed query or database is picked up at once
+        if analyze and "error" not in plan:
+            with self._plan_cache_lock:
+                self._plan_cache[key] = plan
+        return plan
+
+    def get_plan_bytes(self, sql_query: str, analyze: bool = True, refresh: bool = False) -> bytes:
+        """
+        Same as get_plan(), but returns the plan already serialized to JSON,
+        for callers that send it straight over the wire.
+        """
+        return _json_dumps(self.get_plan(sql_query, analyze=analyze, refresh=refresh))
+
+    def get_plans(self, queries: List[str], analyze: bool = True, refresh: bool = False) -> List[Dict[str, Any]]:
+        """
+        Retrieves the execution plans for several SQL queries concurrently.
+
+        Args:
+            queries (List[str]): The SQL queries to explain.
+            analyze (bool): Passed through to get_plan().
+            refresh (bool): Passed through to get_plan().
+
+        Returns:
+            One plan dictionary per query, in the same order as the queries.
+        """
+        if not queries:
+            return []
+        # Each worker checks out its own pooled connection, so the queries
+        # run in parallel backends; more workers than connections would
+        # only wait on the pool.
+        workers = min(self.max_connections, len(queries))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(lambda q: self.get_plan(q, analyze=analyze, refresh=refresh), queries))
+
+    @staticmethod
+    def _reset_connection(conn) -> bool:
+        """
+        Clears the session state left behind by the caller's SQL (settings
+        changed via set_config, temp tables, advisory locks, ...) so it can't
+        leak into later requests on the same pooled connection.
+
+        Returns:
+            True if the connection is clean and can go back to the pool.
+        """
+        if conn.closed:
+            return False
+        try:
+            conn.rollback()
+            # DISCARD ALL can't run inside a transaction block
+            conn.autocommit = True
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("DISCARD ALL")
+            finally:
+                conn.autocommit = False
+        except psycopg2.Error as e:
+            print(f"Could not reset pooled connection: {e}")
+            return False
+        return True
+
+    def _explain(self, conn, explain_query: str) -> Dict[str, Any]:
+        """Runs an EXPLAIN statement on a pooled connection and transforms the plan."""
         try:
-            with psycopg2.connect(**self.db_params) as conn:
+            # `with conn` commits or rolls back, but leaves the connection open for reuse
+            with conn:
                 with conn.cursor() as cursor:
+                    # EXPLAIN can't be wrapped in COPY, so the plan arrives as a json
+                    # column; have psycopg2 decode it with the fastest parser available.
+                    psycopg2.extras.register_default_json(cursor, loads=_json_loads)
                     cursor.execute(explain_query)
-                    # The result of EXPLAIN is always a single row with a single column
+                    # The result of EXPLAIN is always a single row with a single column.
+                    # The default tuple cursor returns it as-is; a dict cursor
+                    # would only add a per-row allocation to the one lookup we need.
                     result = cursor.fetchone()
-                    if not result:
-                        raise ValueError("Query plan could not be generated.")
-                    
-                    # The result is a list containing one JSON string
-                    raw_plan = result[0][0]
-                    
-                    # Transform the raw PG plan into our clean, standard format
-                    return self._transform_plan_node(raw_plan["Plan"])
 
         except psycopg2.Error as e:
             print(f"Database error: {e}")
             # In a real app, you'd raise a custom exception here
             return {"error": str(e)}
 
+        # The transform runs only after the cursor is closed and the transaction
+        # has ended, so libpq's copy of a large plan is already freed and the
+        # connection isn't held open while we build the output tree.
+        if not result:
+            raise ValueError("Query plan could not be generated.")
+
+        # The result is a list containing one JSON string
+        raw_plan = result[0][0]
+
+        # Transform the raw PG plan into our clean, standard format
+        return self._transform_plan_node(raw_plan["Plan"])
+
 # --- Example Usage ---
 
 def setup_test_schema(conn):
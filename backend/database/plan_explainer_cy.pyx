@@ -0,0 +1,62 @@
+# backend/database/plan_explainer_cy.pyx
+# cython: language_level=3, boundscheck=False, wraparound=False
+#
+# Compiled version of PostgresPlanExplainer._transform_plan_node. It must
+# produce exactly the same output; plan_explainer.py falls back to the
+# pure-Python traversal when this extension hasn't been built.
+
+cdef tuple _METRIC_KEYS = (
+    ("Total Cost", "estimated_cost"),
+    ("Plan Rows", "estimated_rows"),
+    ("Actual Total Time", "actual_time_ms"),
+    ("Actual Rows", "actual_rows"),
+)
+
+cdef tuple _DETAIL_KEYS = (
+    ("Join Filter", "Join Filter: "),
+    ("Hash Cond", "Hash Cond: "),
+    ("Filter", "Filter: "),
+    ("Index Cond", "Index Cond: "),
+)
+
+
+cpdef dict transform_plan(dict root):
+    """Transforms a raw PostgreSQL plan tree into our standardized format."""
+    cdef list result = []
+    # A list with a moving read index is a FIFO queue without deque overhead;
+    # FIFO order keeps children in their original order.
+    cdef list queue = [(root, result)]
+    cdef Py_ssize_t i = 0
+    cdef dict node, transformed
+    cdef list siblings, details, children
+    cdef str key, name, prefix
+    cdef object value, child_node, child_nodes
+
+    while i < len(queue):
+        node, siblings = queue[i]
+        i += 1
+
+        transformed = {"node_type": node.get("Node Type", "Unknown")}
+        for key, name in _METRIC_KEYS:
+            value = node.get(key)
+            if value is not None:
+                transformed[name] = value
+
+        details = []
+        for key, prefix in _DETAIL_KEYS:
+            value = node.get(key)
+            if value is not None:
+                details.append(prefix + value)
+        if details:
+            transformed["details"] = details
+
+        siblings.append(transformed)
+
+        child_nodes = node.get("Plans")
+        if child_nodes:
+            children = []
+            transformed["children"] = children
+            for child_node in child_nodes:
+                queue.append((child_node, children))
+
+    return result[0]
@@ -0,0 +1,37 @@
+# backend/setup.py
+#
+# Optional build step that compiles hot paths to C extensions:
+#   * the token-walking parser and analyzer, with mypyc
+#   * the plan-tree transform in the plan explainer, with Cython
+# The pure-Python modules remain the fallback: if the extensions are not
+# built, everything is imported from source as usual.
+#
+# Usage (from the backend/ directory):
+#     pip install mypy cython
+#     python setup.py build_ext --inplace
+#
+# Once built, the extensions take precedence over the source: Python imports
+# core/parser*.so and core/analyser*.so instead of the .py files next to them,
+# and the plan explainer uses database/plan_explainer_cy*.so instead of its
+# Python traversal. Edits to those sources are silently ignored until you
+# rebuild. docker-compose bind-mounts ./backend into /app, so a build on the
+# host shadows the sources inside the container too. To go back to the
+# pure-Python modules, delete the in-place extensions:
+#     rm -f core/*.so database/*.so *__mypyc*.so
+
+from setuptools import Extension, setup
+from mypyc.build import mypycify
+from Cython.Build import cythonize
+
+setup(
+    name="sql-query-optimizer-core",
+    ext_modules=mypycify([
+        "--explicit-package-bases",
+        "--ignore-missing-imports",
+        "core/parser.py",
+        "core/analyser.py",
+    ]) + cythonize(
+        [Extension("database.plan_explainer_cy", ["database/plan_explainer_cy.pyx"])],
+        build_dir="build",
+    ),
+)
@@ -0,0 +1,39 @@
+# backend/tests/test_analyser.py
+
+import pytest
+
+from core.analyser import QueryAnalyzer
+from core.parser import SQLParser
+
+
+def _anti_pattern_types(sql):
+    return [p["type"] for p in QueryAnalyzer(SQLParser(sql)).detect_anti_patterns()]
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT * FROM t",
+    "select *from t",
+    "SELECT *, id FROM t",
+    "SELECT DISTINCT * FROM t",
+    "SELECT /* c */ * FROM t",
+    "SELECT -- x\n* FROM t",
+    "SELECT DISTINCT /* c */ * FROM t",
+    "/* header */ SELECT * FROM t",
+    "SELECT id FROM a UNION SELECT * FROM b",
+    "WITH x AS (SELECT 1) SELECT * FROM x",
+])
+def test_select_star_is_flagged(sql):
+    assert "SELECT_STAR" in _anti_pattern_types(sql)
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT id FROM t",
+    "SELECT COUNT(*) FROM t",
+    "SELECT t.* FROM t",
+    "-- was: SELECT * FROM t\nSELECT id FROM t",
+    "/* SELECT * */ SELECT id FROM t",
+    "SELECT id FROM t WHERE note = 'select * from x'",
+    "SELECT id FROM t WHERE EXISTS (SELECT * FROM u)",
+])
+def test_select_star_is_not_flagged(sql):
+    assert "SELECT_STAR" not in _anti_pattern_types(sql)
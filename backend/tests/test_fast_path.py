@@ -0,0 +1,67 @@
+# backend/tests/test_fast_path.py
+
+import itertools
+
+import pytest
+
+from core.analyser import QueryAnalyzer
+from core.fast_path import analyze_simple_select
+from core.parser import SQLParser
+
+# Select lists the fast path handles, and ones it must leave to the generic path
+SIMPLE_SELECT_LISTS = ["*", "*, name", "id, name", "u.id", "u.*"]
+OTHER_SELECT_LISTS = ["COUNT(*)", "DISTINCT id"]
+FROM_CLAUSES = ["users", "users u", "users AS u"]
+WHERE_CLAUSES = [
+    "",
+    " WHERE id = 5",
+    " WHERE u.age > 3 AND u.city = 'x'",
+    " WHERE note = 'x(y)'",
+    " WHERE note = 'it''s (a)' AND id <> -2",
+    " WHERE note = 'select * from x'",
+    " WHERE u.name = 'a AND b = 1' and total <= 3.5",
+]
+
+SIMPLE_QUERIES = [
+    f"SELECT {select} FROM {from_}{where}"
+    for select, from_, where in itertools.product(SIMPLE_SELECT_LISTS, FROM_CLAUSES, WHERE_CLAUSES)
+] + [
+    "select id from orders o where o.total >= 10;",
+    "SELECT id\nFROM orders\nWHERE status = 'open'  AND\n total < 5 ;\n",
+]
+
+OTHER_QUERIES = [
+    f"SELECT {select} FROM {from_}{where}"
+    for select, from_, where in itertools.product(OTHER_SELECT_LISTS, FROM_CLAUSES, WHERE_CLAUSES)
+] + [
+    "SELECT id FROM users u JOIN orders o ON u.id = o.user_id",
+    "SELECT id FROM users WHERE a = 'x\\' AND b = 'y'",
+    "SELECT id FROM users WHERE id = 1 OR id = 2",
+    "SELECT id FROM users ORDER BY id",
+    "SELECT user FROM users",
+]
+
+
+def _generic_analysis(sql):
+    parser = SQLParser(sql)
+    return QueryAnalyzer(parser).run_analysis(), parser.get_tables_and_aliases()
+
+
+def _sorted_usage(report):
+    return dict(report, column_usage={key: sorted(cols) for key, cols in report["column_usage"].items()})
+
+
+@pytest.mark.parametrize("sql", SIMPLE_QUERIES)
+def test_fast_path_matches_generic_path(sql):
+    fast = analyze_simple_select(sql)
+    assert fast is not None
+
+    fast_report, fast_aliases = fast
+    generic_report, generic_aliases = _generic_analysis(sql)
+    assert _sorted_usage(fast_report) == _sorted_usage(generic_report)
+    assert fast_aliases == generic_aliases
+
+
+@pytest.mark.parametrize("sql", OTHER_QUERIES)
+def test_fast_path_rejects_other_shapes(sql):
+    assert analyze_simple_select(sql) is None
@@ -0,0 +1,28 @@
+# backend/tests/test_parser.py
+
+import pytest
+
+from core.parser import _collapse_literal_lists
+
+
+def _in_list(n, tail=""):
+    return "SELECT id FROM t WHERE id IN (" + ", ".join(map(str, range(n))) + tail + ")"
+
+
+def test_lists_of_ten_or_more_literals_are_collapsed():
+    assert _collapse_literal_lists(_in_list(10)) == "SELECT id FROM t WHERE id IN (0, 9)"
+    assert _collapse_literal_lists(_in_list(10, ", NULL")) == "SELECT id FROM t WHERE id IN (0, NULL)"
+
+
+def test_shorter_lists_are_kept():
+    assert _collapse_literal_lists(_in_list(9)) == _in_list(9)
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT '(1, 2, 3, 4, 5, 6, 7, 8, 9, 10)' FROM t",
+    'SELECT "(1, 2, 3, 4, 5, 6, 7, 8, 9, 10)" FROM t',
+    "SELECT id FROM t -- (1, 2, 3, 4, 5, 6, 7, 8, 9, 10)\n",
+    "SELECT id /* (1, 2, 3, 4, 5, 6, 7, 8, 9, 10) */ FROM t",
+])
+def test_quoted_spans_and_comments_are_kept(sql):
+    assert _collapse_literal_lists(sql) == sql